@@ -1,44 +1,65 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from polygon import RESTClient
 from datetime import datetime, timedelta
 
-# Initialize session state variables
-if 'stock_types' not in st.session_state:
-    st.session_state.stock_types = ""
-if 'exchanges' not in st.session_state:
-    st.session_state.exchanges = ""
-
 # Streamlit app details
 st.set_page_config(page_title="Financial Analysis", layout="wide")
 with st.sidebar:
     st.title("Financial Analysis")
-    ticker = st.text_input("Stock ticker (e.g. AAPL)", "AAPL")
-    polygon_api_key = st.text_input("Polygon API key", type="password")
-    button = st.button("Submit")
-
-# Authenticate with the Polygon API
-client = RESTClient(polygon_api_key)
+    # Batch the inputs in a form so editing them doesn't rerun the script until submit
+    with st.form("inputs", border=False):
+        ticker = st.text_input("Stock ticker (e.g. AAPL)", "AAPL")
+        polygon_api_key = st.text_input("Polygon API key", type="password")
+        button = st.form_submit_button("Submit")
+
+# Authenticate with the Polygon API, reusing the client across reruns
+@st.cache_resource(show_spinner=False, max_entries=100)
+def get_client(api_key):
+    from polygon import RESTClient
+
+    return RESTClient(api_key)
+
+# Get supported stock ticker types, shared across sessions and refreshed daily
+@st.cache_data(show_spinner=False, max_entries=100, ttl="1d")
+def load_stock_types(api_key):
+    return {
+        stock_type.code: stock_type.description
+        for stock_type in get_client(api_key).get_ticker_types(asset_class='stocks')
+    }
+
+# Get supported stock exchanges, shared across sessions and refreshed daily
+@st.cache_data(show_spinner=False, max_entries=100, ttl="1d")
+def load_exchanges(api_key):
+    return {
+        exchange.mic: exchange.name
+        for exchange in get_client(api_key).get_exchanges(asset_class='stocks')
+    }
 
 # Get stock ticker type description for a given code
-@st.cache_data
-def get_stock_type(code):
-    for stock_type in st.session_state.stock_types:
-        if stock_type.code == code:
-            return stock_type.description
-    return None
+def get_stock_type(api_key, code):
+    return load_stock_types(api_key).get(code)
 
 # Get stock exchange name for a given code
-@st.cache_data
-def get_exchange_name(code):
-    for exchange in st.session_state.exchanges:
-        if exchange.mic == code:
-            return exchange.name
-    return None
+def get_exchange_name(api_key, code):
+    return load_exchanges(api_key).get(code)
+
+# Retrieve stock ticker details
+@st.cache_data(show_spinner=False, max_entries=100, ttl="1h")
+def load_ticker_details(api_key, ticker):
+    return get_client(api_key).get_ticker_details(ticker)
+
+# Retrieve the previous trading day's aggregate
+@st.cache_data(show_spinner=False, max_entries=100, ttl="1h")
+def load_previous_close(api_key, ticker):
+    return get_client(api_key).get_previous_close_agg(ticker)[0]
+
+# Retrieve the most recent financial filing, or None if there is none
+@st.cache_data(show_spinner=False, max_entries=100, ttl="1d")
+def load_latest_financials(api_key, ticker):
+    fin = get_client(api_key).vx.list_stock_financials(ticker, sort='filing_date', order='desc', limit=1)
+    return next(iter(fin), None)
 
 # Format market cap and financial info into readable values
-@st.cache_data
 def format_value(value):
     suffixes = ["", "K", "M", "B", "T"]
     suffix_index = 0
@@ -47,94 +68,107 @@ def format_value(value):
         suffix_index += 1
     return f"${value:.1f}{suffixes[suffix_index]}"
 
+# Retrieve daily price history for a given ticker and date range
+@st.cache_data(show_spinner=False, max_entries=100, ttl="1h")
+def load_price_history(api_key, ticker, start_date, end_date):
+    history = list(get_client(api_key).list_aggs(ticker, 1, 'day', start_date, end_date, limit=50))
+    return pd.DataFrame({
+        'date': pd.to_datetime([agg.timestamp for agg in history], unit='ms').normalize(),
+        'close': [agg.close for agg in history]
+    })
+
+# Build the historical price chart, sharing the figure object across reruns
+@st.cache_resource(show_spinner=False, max_entries=100)
+def build_price_chart(chart_data):
+    import plotly.express as px
+
+    price_chart = px.line(chart_data, x='date', y='close', width=1000, height=400, line_shape='spline')
+    price_chart.update_layout(
+        xaxis_title="Date",
+        yaxis_title="Price"
+    )
+    return price_chart
+
+# Render a list of (label, value) rows, headed by its column names, in a column
+def show_table(col, rows):
+    df = pd.DataFrame(rows[1:], columns=rows[0])
+    col.dataframe(df, width=400, hide_index=True)
+
+# Normalize inputs once so validation, API calls and cache keys agree
+polygon_api_key = polygon_api_key.strip()
+ticker = ticker.strip().upper()
+
 # If Submit button is clicked
 if button:
-    if not polygon_api_key.strip():
+    if not polygon_api_key:
         st.error("Please provide a valid API key.")
-    elif not ticker.strip():
+    elif not ticker:
         st.error("Please provide a valid stock ticker.")
     else:
         try:
             with st.spinner('Please wait...'):
-                # Get supported stock ticker types
-                if not st.session_state.stock_types:
-                    st.session_state.stock_types = client.get_ticker_types(asset_class='stocks')
-
-                # Get supported stock exchanges
-                if not st.session_state.exchanges:
-                    st.session_state.exchanges = client.get_exchanges(asset_class='stocks')
-
                 # Retrieve stock ticker details
-                info = client.get_ticker_details(ticker)
+                info = load_ticker_details(polygon_api_key, ticker)
                 st.subheader(f"{ticker} - {info.name}")
 
                 # Plot historical price chart for the last 30 days
                 end_date = datetime.now().date()
                 start_date = end_date - timedelta(days=30)
 
-                history = client.list_aggs(ticker, 1, 'day', start_date, end_date, limit=50)
-                chart_data = pd.DataFrame(history) 
-                chart_data['timestamp'] = pd.to_datetime(chart_data['timestamp'], unit='ms') 
-                chart_data['date'] = chart_data['timestamp'].dt.strftime('%Y-%m-%d')
-                
-                price_chart = px.line(chart_data, x='date', y='close', width=1000, height=400, line_shape='spline')
-                price_chart.update_layout(
-                    xaxis_title="Date",         
-                    yaxis_title="Price"
-                )
+                chart_data = load_price_history(polygon_api_key, ticker, start_date, end_date)
 
-                st.plotly_chart(price_chart)
+                st.plotly_chart(build_price_chart(chart_data))
 
                 col1, col2, col3 = st.columns(3)
 
                 # Display stock information as a dataframe
                 stock_info = [
                     ("Stock Info", "Value"),
-                    ("Type", get_stock_type(info.type)),
-                    ("Primary Exchange", get_exchange_name(info.primary_exchange)),
+                    ("Type", get_stock_type(polygon_api_key, info.type)),
+                    ("Primary Exchange", get_exchange_name(polygon_api_key, info.primary_exchange)),
                     ("Listing Date", info.list_date),
                     ("Market Cap", format_value(info.market_cap)),
                     ("Employees", f"{info.total_employees:,.0f}"),
                     ("Website", info.homepage_url.replace("https://", ""))
                 ]
                 
-                df = pd.DataFrame(stock_info[1:], columns=stock_info[0])
-                col1.dataframe(df, width=400, hide_index=True)
+                show_table(col1, stock_info)
                 
                 # Display price information as a dataframe
-                agg = client.get_previous_close_agg(ticker)
+                agg = load_previous_close(polygon_api_key, ticker)
 
                 price_info = [
                     ("Price Info", "Value"),
-                    ("Prev Day Close", f"${agg[0].close:.2f}"),
-                    ("Prev Day Open", f"${agg[0].open:.2f}"),
-                    ("Prev Day High", f"${agg[0].high:.2f}"),
-                    ("Prev Day Low", f"${agg[0].low:.2f}"),
-                    ("Volume", f"{agg[0].volume:,.0f}"),
-                    ("VW Avg Price", f"${agg[0].vwap:.2f}")
+                    ("Prev Day Close", f"${agg.close:.2f}"),
+                    ("Prev Day Open", f"${agg.open:.2f}"),
+                    ("Prev Day High", f"${agg.high:.2f}"),
+                    ("Prev Day Low", f"${agg.low:.2f}"),
+                    ("Volume", f"{agg.volume:,.0f}"),
+                    ("VW Avg Price", f"${agg.vwap:.2f}")
                 ]
                 
-                df = pd.DataFrame(price_info[1:], columns=price_info[0])
-                col2.dataframe(df, width=400, hide_index=True)
+                show_table(col2, price_info)
                 
                 # Display historical financial information as a dataframe
-                fin = client.vx.list_stock_financials(ticker, sort='filing_date', order='desc', limit=2)
-                
-                for item in fin:
-                    break
-                
-                fin_metrics = [
-                     ("Financial Metrics", "Value"),
-                    ("Fiscal Period", item.fiscal_period + " " + item.fiscal_year),
-                    ("Total Assets", format_value(item.financials.balance_sheet['assets'].value)),
-                    ("Total Liabilities", format_value(item.financials.balance_sheet['liabilities'].value)),
-                    ("Revenues", format_value(item.financials.income_statement.revenues.value)),
-                    ("Net Cash Flow", format_value(item.financials.cash_flow_statement.net_cash_flow.value)),
-                    ("Basic EPS", f"${item.financials.income_statement.basic_earnings_per_share.value}")
-                ]
-                
-                df = pd.DataFrame(fin_metrics[1:], columns=fin_metrics[0])
-                col3.dataframe(df, width=400, hide_index=True)
+                item = load_latest_financials(polygon_api_key, ticker)
+
+                if item is None:
+                    col3.info("No financial data available.")
+                else:
+                    balance_sheet = item.financials.balance_sheet
+                    income_statement = item.financials.income_statement
+
+                    fin_metrics = [
+                        ("Financial Metrics", "Value"),
+                        ("Fiscal Period", item.fiscal_period + " " + item.fiscal_year),
+                        ("Total Assets", format_value(balance_sheet['assets'].value)),
+                        ("Total Liabilities", format_value(balance_sheet['liabilities'].value)),
+                        ("Revenues", format_value(income_statement.revenues.value)),
+                        ("Net Cash Flow", format_value(item.financials.cash_flow_statement.net_cash_flow.value)),
+                        ("Basic EPS", f"${income_statement.basic_earnings_per_share.value}")
+                    ]
+
+                    show_table(col3, fin_metrics)
 
         except Exception as e:
             if "too many 429 error responses" in str(e):